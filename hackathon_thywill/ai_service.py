@@ -1,16 +1,45 @@
 import requests
+import httpx
+import asyncio
+import hashlib
 import json
 import os
-from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
+from generation_cache import cache_key, generation_cache
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Used when prayer_prompt.txt is missing
+INLINE_PROMPT_TEMPLATE = """You are a compassionate spiritual guide helping to craft prayer responses. 
+
+Someone named {author_name} has shared this prayer request:
+"{prayer_request}"
+
+Please write a gentle, faith-affirming prayer response that:
+- Acknowledges their specific situation with empathy
+- Offers comfort and hope
+- Uses inclusive, non-denominational spiritual language
+- Ends with "Amen" or similar closing
+- Keeps it concise (2-3 sentences)
+- Focuses on peace, strength, healing, or guidance as appropriate
+
+Write only the prayer response, nothing else."""
+
+class IncompleteResponseError(Exception):
+    """The response stream ended before the model finished, after some text was sent"""
+
 class ClaudeAIService:
     def __init__(self):
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
         self.base_url = "https://api.anthropic.com/v1/messages"
+        self.model = "claude-3-haiku-20240307"
+        self.prompt_path = "prayer_prompt.txt"
+        self._template = None
+        self._template_version = None
+        self._template_mtime = None
         
     def generate_prayer_response(self, prayer_request: str, author_name: str = "someone") -> Optional[str]:
         """Generate a compassionate AI prayer response to a prayer request"""
@@ -18,63 +47,164 @@ class ClaudeAIService:
         if not self.api_key:
             return self._fallback_prayer()
             
-        # Load prompt from file
-        try:
-            with open("prayer_prompt.txt", "r") as f:
-                prompt_template = f.read()
-            prompt = prompt_template.format(author_name=author_name, prayer_request=prayer_request)
-        except FileNotFoundError:
-            # Fallback to inline prompt if file not found
-            prompt = f"""You are a compassionate spiritual guide helping to craft prayer responses. 
+        prompt, key = self._prepare(prayer_request, author_name)
+        cached = generation_cache.get(key)
+        if cached:
+            return cached
 
-Someone named {author_name} has shared this prayer request:
-"{prayer_request}"
+        future = generation_cache.claim(key)
+        if future:
+            # The same request is already being generated in this worker
+            return future.result() or self._fallback_prayer()
 
-Please write a gentle, faith-affirming prayer response that:
-- Acknowledges their specific situation with empathy
-- Offers comfort and hope
-- Uses inclusive, non-denominational spiritual language
-- Ends with "Amen" or similar closing
-- Keeps it concise (2-3 sentences)
-- Focuses on peace, strength, healing, or guidance as appropriate
+        text, cacheable = None, False
+        try:
+            text = generation_cache.wait_for_other_workers(key)
+            if text is None:
+                text = self._request_prayer(prompt)
+                cacheable = True
+        finally:
+            generation_cache.release(key, text, cache=cacheable)
+        return text or self._fallback_prayer()
 
-Write only the prayer response, nothing else."""
+    def cached_prayer_response(self, prayer_request: str, author_name: str = "someone") -> Optional[str]:
+        """Return the cached response for a repeated request, without calling the API"""
+        if not self.api_key:
+            return None
+        _, key = self._prepare(prayer_request, author_name)
+        return generation_cache.get(key)
 
+    def _request_prayer(self, prompt: str) -> Optional[str]:
+        """Call the messages API, returning the response text or None on failure"""
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "x-api-key": self.api_key,
-                "anthropic-version": "2023-06-01"
-            }
-            
-            data = {
-                "model": "claude-3-haiku-20240307",
-                "max_tokens": 200,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            }
-            
             response = requests.post(
                 self.base_url,
-                headers=headers,
-                json=data,
+                headers=self._headers(),
+                json=self._request_body(prompt),
                 timeout=10
             )
             
             if response.status_code == 200:
                 result = response.json()
                 if result.get("content") and len(result["content"]) > 0:
-                    return result["content"][0].get("text", "").strip()
+                    return result["content"][0].get("text", "").strip() or None
                     
         except Exception as e:
             print(f"Claude API error: {e}")
             
-        return self._fallback_prayer()
+        return None
     
+    def _load_template(self) -> tuple[str, str]:
+        """Return (template, version), re-reading the file only when its mtime changes"""
+        try:
+            mtime = os.stat(self.prompt_path).st_mtime_ns
+        except FileNotFoundError:
+            return INLINE_PROMPT_TEMPLATE, "inline"
+        if mtime != self._template_mtime:
+            with open(self.prompt_path, "r") as f:
+                template = f.read()
+            version = hashlib.sha256(template.encode()).hexdigest()[:12]
+            self._template, self._template_version, self._template_mtime = template, version, mtime
+        return self._template, self._template_version
+
+    def _prepare(self, prayer_request: str, author_name: str) -> tuple[str, str]:
+        """Return (prompt, cache key) for a prayer request"""
+        template, version = self._load_template()
+        prompt = template.format(author_name=author_name, prayer_request=prayer_request)
+        return prompt, cache_key(prayer_request, author_name, version, self.model)
+
+    def _headers(self) -> dict:
+        return {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01"
+        }
+
+    def _request_body(self, prompt: str, stream: bool = False) -> dict:
+        data = {
+            "model": self.model,
+            "max_tokens": 200,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+        if stream:
+            data["stream"] = True
+        return data
+
+    async def stream_prayer_response(self, prayer_request: str, author_name: str = "someone") -> AsyncIterator[str]:
+        """Yield the AI prayer response in text chunks as the model produces them
+
+        Uses the messages API server-sent event stream. If the API is not
+        configured or fails before any text arrives, the fallback prayer is
+        yielded as a single chunk. If it fails after text has been yielded,
+        IncompleteResponseError is raised so the caller can discard it.
+        """
+        if not self.api_key:
+            yield self._fallback_prayer()
+            return
+
+        prompt, key = self._prepare(prayer_request, author_name)
+        cached = await run_in_threadpool(generation_cache.get, key)
+        if cached:
+            yield cached
+            return
+
+        future = generation_cache.claim(key)
+        if future:
+            # The same request is already being generated in this worker
+            yield await asyncio.wrap_future(future) or self._fallback_prayer()
+            return
+
+        text, cacheable = None, False
+        try:
+            text = await run_in_threadpool(generation_cache.wait_for_other_workers, key)
+            if text:
+                yield text
+                return
+
+            chunks = []
+            completed = False
+            try:
+                async with httpx.AsyncClient(timeout=httpx.Timeout(30, connect=10)) as client:
+                    async with client.stream(
+                        "POST",
+                        self.base_url,
+                        headers=self._headers(),
+                        json=self._request_body(prompt, stream=True)
+                    ) as response:
+                        if response.status_code == 200:
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                event = json.loads(line[len("data:"):])
+                                if event.get("type") == "content_block_delta":
+                                    chunk = event.get("delta", {}).get("text", "")
+                                    if chunk:
+                                        chunks.append(chunk)
+                                        yield chunk
+                                elif event.get("type") == "message_stop":
+                                    completed = True
+                                    break
+                        else:
+                            print(f"Claude API error: {response.status_code}")
+            except Exception as e:
+                print(f"Claude API streaming error: {e}")
+
+            if not chunks:
+                text = self._fallback_prayer()
+                yield text
+            elif not completed:
+                raise IncompleteResponseError("Prayer response stream ended early")
+            else:
+                text, cacheable = "".join(chunks).strip(), True
+        finally:
+            # Shielded so waiters are released even if this generator is cancelled
+            await asyncio.shield(run_in_threadpool(generation_cache.release, key, text, cacheable))
+
     def _fallback_prayer(self) -> str:
         """Fallback prayer when API is unavailable"""
         return "May you find peace and strength in this time. Know that you are held in love and that hope remains, even in difficult moments. Amen."
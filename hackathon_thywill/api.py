@@ -0,0 +1,88 @@
+"""
+Compact JSON feed for polling clients.
+
+GET /api/prayers returns the newest prayers plus a cursor. Passing that
+cursor back as ?since= returns only prayers whose text, generated prayer,
+count or author name changed after it, oldest change first. Responses
+carry an ETag derived from the change counter, so a poll with nothing new
+is answered with a 304 after a single-row lookup. change_seq is assigned
+by triggers (migration 007), so every writer is picked up.
+
+The feed is public and the same for every visitor, which keeps responses
+cacheable; it does not include whether the current user marked a prayer.
+Archived prayers are not included.
+"""
+
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from database import get_db
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+router = APIRouter(prefix="/api")
+
+PRAYER_COLUMNS = """
+    p.id, p.text, u.display_name, p.created_at, p.generated_prayer, p.change_seq,
+    (SELECT COUNT(*) FROM prayer_marks pm WHERE pm.prayer_id = p.id) as prayer_count
+"""
+
+def _prayer_json(row) -> dict:
+    return {
+        "id": row["id"],
+        "text": row["text"],
+        "author": row["display_name"],
+        "created_at": row["created_at"],
+        "generated": row["generated_prayer"],
+        "count": row["prayer_count"],
+    }
+
+@router.get("/prayers")
+def list_prayers(
+    since: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
+    db = Depends(get_db)
+):
+    """Newest prayers, or with ?since=<cursor> only what changed after it"""
+    try:
+        since_seq = int(since) if since is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    latest_seq = db.execute("SELECT seq FROM change_counter").fetchone()[0]
+    etag = f'W/"{latest_seq}-{since_seq if since_seq is not None else "all"}-{limit}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    if since_seq is None:
+        rows = db.execute(f"""
+            SELECT {PRAYER_COLUMNS} FROM prayers p LEFT JOIN users u ON p.author_id = u.id
+            ORDER BY p.created_at DESC LIMIT ?
+        """, (limit,)).fetchall()
+        cursor, has_more = latest_seq, False
+    else:
+        rows = db.execute(f"""
+            SELECT {PRAYER_COLUMNS} FROM prayers p LEFT JOIN users u ON p.author_id = u.id
+            WHERE p.change_seq > ?
+            ORDER BY p.change_seq LIMIT ?
+        """, (since_seq, limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        # Resume after the last change returned, or stay put if nothing changed
+        cursor = rows[-1]["change_seq"] if rows else since_seq
+
+    body = dumps({
+        "cursor": str(cursor),
+        "has_more": has_more,
+        "prayers": [_prayer_json(row) for row in rows],
+    })
+    return Response(content=body, media_type="application/json", headers=headers)
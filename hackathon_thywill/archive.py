@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Move old prayers and their marks into the archive tables
+
+Prayers older than ARCHIVE_AFTER_DAYS are moved from prayers/prayer_marks
+to prayers_archive/prayer_marks_archive in small batches. Each batch is
+its own short transaction, so readers and other writers only ever wait
+for one batch. The feed reads the archive only once paging runs past the
+hot prayers.
+
+    python archive.py --days 365
+"""
+
+import argparse
+import os
+import time
+from typing import Optional
+from database import connect
+from feed_index import feed_index
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))  # 0 disables the background job
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+def archive_batch(conn, max_age_days: int, batch_size: int) -> int:
+    """Archive up to batch_size of the oldest eligible prayers, returning how many moved"""
+    prayer_ids = [row[0] for row in conn.execute("""
+        SELECT id FROM prayers
+        WHERE created_at < datetime('now', ?)
+        ORDER BY created_at
+        LIMIT ?
+    """, (f"-{max_age_days} days", batch_size))]
+    if not prayer_ids:
+        return 0
+
+    placeholders = ",".join("?" * len(prayer_ids))
+    with conn:
+        conn.execute(f"""
+            INSERT OR REPLACE INTO prayers_archive (id, text, author_id, created_at, generated_prayer)
+            SELECT id, text, author_id, created_at, generated_prayer FROM prayers WHERE id IN ({placeholders})
+        """, prayer_ids)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO prayer_marks_archive (user_id, prayer_id, created_at)
+            SELECT user_id, prayer_id, created_at FROM prayer_marks WHERE prayer_id IN ({placeholders})
+        """, prayer_ids)
+        conn.execute(f"DELETE FROM prayer_marks WHERE prayer_id IN ({placeholders})", prayer_ids)
+        conn.execute(f"DELETE FROM prayers WHERE id IN ({placeholders})", prayer_ids)
+    return len(prayer_ids)
+
+def archive_old_prayers(max_age_days: Optional[int] = None, batch_size: Optional[int] = None, pause: float = 0.05) -> int:
+    """Archive every prayer older than max_age_days, returning how many moved"""
+    max_age_days = max_age_days or ARCHIVE_AFTER_DAYS
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+    if max_age_days <= 0:
+        return 0
+
+    conn = connect()
+    total = 0
+    try:
+        while True:
+            moved = archive_batch(conn, max_age_days, batch_size)
+            total += moved
+            if moved < batch_size:
+                break
+            # Let queued writers in between batches
+            time.sleep(pause)
+    finally:
+        conn.close()
+
+    if total:
+        # Archived prayers leave the hot feed; have every worker rebuild its index
+        feed_index.reset_generation.bump(seen=False)
+    return total
+
+def archived_feed_page(db, user_id: str, offset: int, limit: int) -> tuple[list, bool]:
+    """Return (archived prayers newest first, has_more), shaped like feed rows"""
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT p.id, p.text, p.author_id, p.created_at, p.generated_prayer, u.display_name,
+               (SELECT COUNT(*) FROM prayer_marks_archive pm WHERE pm.prayer_id = p.id) as prayer_count,
+               EXISTS (SELECT 1 FROM prayer_marks_archive upm WHERE upm.prayer_id = p.id AND upm.user_id = ?) as user_marked
+        FROM prayers_archive p
+        LEFT JOIN users u ON p.author_id = u.id
+        ORDER BY p.created_at DESC
+        LIMIT ? OFFSET ?
+    """, (user_id, limit + 1, offset))
+    prayers = cursor.fetchall()
+    return prayers[:limit], len(prayers) > limit
+
+def has_archived_prayers(db) -> bool:
+    return db.execute("SELECT 1 FROM prayers_archive LIMIT 1").fetchone() is not None
+
+def is_archived(db, prayer_id: str) -> bool:
+    return db.execute("SELECT 1 FROM prayers_archive WHERE id = ?", (prayer_id,)).fetchone() is not None
+
+def marks_table(db, prayer_id: str) -> str:
+    """Name of the table holding marks for prayer_id"""
+    return "prayer_marks_archive" if is_archived(db, prayer_id) else "prayer_marks"
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old prayers into the archive tables")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS or 365, help="Archive prayers older than this many days")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    print(f"Archiving prayers older than {args.days} days...")
+    total = archive_old_prayers(args.days, args.batch_size)
+    print(f"\n✅ Archive completed! Moved {total} prayers")
+
+if __name__ == "__main__":
+    main()
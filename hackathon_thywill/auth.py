@@ -4,25 +4,78 @@ import sqlite3
 import uuid
 from datetime import datetime, timedelta
 import hashlib
+import hmac
+import os
+import secrets
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from database import get_db, connect
+from coordination import file_lock, STATE_DIR
+from rate_limit import ConcurrencyGate
 
-DATABASE_PATH = "database.db"
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def get_db():
-    """Get database connection with thread-safe settings"""
-    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+# bcrypt releases the GIL, so a small thread pool hashes in parallel without
+# blocking the event loop; the gate bounds how much work can queue for it
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_gate = ConcurrencyGate(
+    "Sign-in",
+    limit=PASSWORD_HASH_WORKERS,
+    max_waiting=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+)
+
+def _is_legacy_hash(hashed: str) -> bool:
+    """Passwords stored before bcrypt were a bare SHA-256 hex digest"""
+    return len(hashed) == 64 and all(c in "0123456789abcdef" for c in hashed)
 
 def hash_password(password: str) -> str:
-    """Simple password hashing"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password with bcrypt"""
+    return pwd_context.hash(password)
 
-def verify_password(password: str, hashed: str) -> bool:
+def verify_password(password: str, hashed: Optional[str]) -> bool:
     """Verify password against hash"""
-    return hash_password(password) == hashed
+    return verify_and_update_password(password, hashed)[0]
+
+_DUMMY_HASH = None
+
+def _burn_verify(password: str) -> None:
+    """Spend as long as a real bcrypt check, so failures don't reveal which usernames exist"""
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(secrets.token_hex(16))
+    pwd_context.verify(password, _DUMMY_HASH)
+
+def verify_and_update_password(password: str, hashed: Optional[str]) -> tuple[bool, Optional[str]]:
+    """Verify a password, returning (valid, new_hash)
+
+    new_hash is set when the stored hash is a legacy SHA-256 digest or uses
+    outdated bcrypt settings, and should replace the stored one. Pass
+    hashed=None for an unknown user; it still costs one bcrypt check.
+    """
+    if not hashed:
+        _burn_verify(password)
+        return False, None
+    if _is_legacy_hash(hashed):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        if hmac.compare_digest(legacy, hashed):
+            return True, hash_password(password)
+        _burn_verify(password)
+        return False, None
+    return pwd_context.verify_and_update(password, hashed)
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the password pool, keeping the event loop free"""
+    async with password_gate.slot():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_pool, hash_password, password)
+
+async def verify_and_update_password_async(password: str, hashed: Optional[str]) -> tuple[bool, Optional[str]]:
+    """verify_and_update_password on the password pool, keeping the event loop free"""
+    async with password_gate.slot():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_pool, verify_and_update_password, password, hashed)
 
 def create_session(user_id: str, db) -> str:
     """Create a new session for user"""
@@ -63,42 +116,95 @@ def get_current_user_optional(session_id: Optional[str] = Cookie(None), db = Dep
     """Get current user but don't require authentication"""
     return get_current_user(session_id, db)
 
-def create_anonymous_user(db) -> str:
-    """Create anonymous user for session tracking"""
-    user_id = str(uuid.uuid4())
-    anonymous_name = f"Anonymous_{user_id[:8]}"
-    
-    cursor = db.cursor()
-    cursor.execute(
-        "INSERT INTO users (id, display_name) VALUES (?, ?)",
-        (user_id, anonymous_name)
-    )
-    db.commit()
-    return user_id
+_SECRET_KEY = None
 
-def get_or_create_session_user(session_id: Optional[str] = Cookie(None), db = Depends(get_db)) -> tuple[Optional[dict], str]:
-    """Get current user or create anonymous session, returning (user, session_id)"""
+def _secret_key() -> bytes:
+    """Key for signing visitor cookies, shared by every worker
+
+    Uses SECRET_KEY when set, otherwise a random key generated once and
+    kept in the coordination state directory.
+    """
+    global _SECRET_KEY
+    if _SECRET_KEY is None:
+        if os.getenv("SECRET_KEY"):
+            _SECRET_KEY = os.getenv("SECRET_KEY").encode()
+        else:
+            key_file = STATE_DIR / "secret_key"
+            with file_lock("secret_key"):
+                if not key_file.exists():
+                    key_file.write_text(secrets.token_hex(32))
+                    key_file.chmod(0o600)
+            _SECRET_KEY = key_file.read_text().strip().encode()
+    return _SECRET_KEY
+
+def sign_visitor_id(user_id: str) -> str:
+    """Build a tamper-proof visitor cookie value for an anonymous user id"""
+    signature = hmac.new(_secret_key(), user_id.encode(), hashlib.sha256).hexdigest()[:32]
+    return f"{user_id}.{signature}"
+
+def read_visitor_id(visitor_id: Optional[str]) -> Optional[str]:
+    """Return the anonymous user id from a visitor cookie, or None if invalid"""
+    if not visitor_id or "." not in visitor_id:
+        return None
+    user_id, _ = visitor_id.rsplit(".", 1)
+    if hmac.compare_digest(sign_visitor_id(user_id), visitor_id):
+        return user_id
+    return None
+
+def get_session_user(session_id: Optional[str], visitor_id: Optional[str], db) -> dict:
+    """Get current user, falling back to a stateless anonymous identity
+
+    Anonymous visitors are identified by the signed visitor cookie alone;
+    nothing is written to the database until persist_anonymous_user().
+    """
     current_user = get_current_user(session_id, db) if session_id else None
     
     if current_user:
-        return current_user, session_id
+        return current_user
     
-    # Create anonymous user and session
-    user_id = create_anonymous_user(db)
-    new_session_id = create_session(user_id, db)
-    
-    # Get the newly created user
-    cursor = db.cursor()
-    cursor.execute("SELECT id, display_name FROM users WHERE id = ?", (user_id,))
-    user_data = cursor.fetchone()
-    
-    anonymous_user = {
-        "id": user_data[0],
-        "display_name": user_data[1],
-        "is_anonymous": True
+    user_id = read_visitor_id(visitor_id) or str(uuid.uuid4())
+    return {
+        "id": user_id,
+        "display_name": f"Anonymous_{user_id[:8]}",
+        "is_anonymous": True,
+        "persisted": False
     }
+
+def persist_anonymous_user(user: dict, db) -> Optional[str]:
+    """Create the users and sessions rows for an anonymous visitor on first write
+
+    Returns the new session id, or None if the user already had one.
+    """
+    if user.get("persisted", True):
+        return None
     
-    return anonymous_user, new_session_id
+    cursor = db.cursor()
+    # The row may already exist if the visitor wrote before and lost their session cookie
+    cursor.execute(
+        "INSERT OR IGNORE INTO users (id, display_name) VALUES (?, ?)",
+        (user["id"], user["display_name"])
+    )
+    cursor.execute("SELECT display_name FROM users WHERE id = ?", (user["id"],))
+    row = cursor.fetchone()
+    if row is None:
+        # OR IGNORE also skipped the insert because someone else holds the
+        # default name; the full id is unique
+        user["display_name"] = f"Anonymous_{user['id']}"
+        cursor.execute(
+            "INSERT INTO users (id, display_name) VALUES (?, ?)",
+            (user["id"], user["display_name"])
+        )
+    else:
+        user["display_name"] = row[0]
+    user["persisted"] = True
+    return create_session(user["id"], db)
+
+def set_identity_cookies(response, user: dict, visitor_id: Optional[str], new_session_id: Optional[str] = None) -> None:
+    """Set the session cookie for a new session and the visitor cookie for new anonymous visitors"""
+    if new_session_id:
+        response.set_cookie(key="session_id", value=new_session_id, httponly=True, max_age=30*24*60*60)
+    if user.get("is_anonymous") and read_visitor_id(visitor_id) != user["id"]:
+        response.set_cookie(key="visitor_id", value=sign_visitor_id(user["id"]), httponly=True, max_age=365*24*60*60)
 
 def require_auth(user = Depends(get_current_user)) -> dict:
     """Require user to be authenticated"""
@@ -107,4 +213,14 @@ def require_auth(user = Depends(get_current_user)) -> dict:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication required"
         )
-    return user
\ No newline at end of file
+    return user
+
+def delete_expired_sessions() -> int:
+    """Remove sessions past their expiry, returning how many were deleted"""
+    conn = connect()
+    try:
+        cursor = conn.execute("DELETE FROM sessions WHERE expires_at <= datetime('now')")
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
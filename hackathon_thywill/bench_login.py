@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: does login load slow down the feed?
+
+Against a running server, measures GET / latency on its own, then again
+while several clients log in continuously, and reports login throughput.
+With hashing on the password pool the two feed latency figures should be
+close; with hashing on the event loop they diverge sharply.
+
+    python main.py &
+    python bench_login.py --url http://localhost:8000 --seconds 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+
+async def measure_feed(client: httpx.AsyncClient, seconds: float) -> list[float]:
+    """Request the feed back to back for `seconds`, returning latencies in ms"""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get("/")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+async def login_loop(client: httpx.AsyncClient, username: str, password: str, deadline: float) -> int:
+    """Log in repeatedly until deadline, returning how many logins succeeded"""
+    count = 0
+    while time.perf_counter() < deadline:
+        response = await client.post("/login", data={"username": username, "password": password})
+        if response.status_code == 303:
+            count += 1
+    return count
+
+def summarize(label: str, latencies: list[float]) -> None:
+    p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+    print(f"  {label}: {len(latencies)} requests, p50 {statistics.median(latencies):.1f}ms, p95 {p95:.1f}ms")
+
+async def run(url: str, seconds: float, login_clients: int) -> None:
+    username, password = f"bench_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        await client.post("/register", data={"username": username, "password": password})
+
+    async with httpx.AsyncClient(base_url=url, timeout=30) as feed_client:
+        print("Measuring feed latency without login load...")
+        idle = await measure_feed(feed_client, seconds)
+
+        print(f"Measuring feed latency with {login_clients} clients logging in...")
+        deadline = time.perf_counter() + seconds
+        login_client_pool = [httpx.AsyncClient(base_url=url, timeout=30) for _ in range(login_clients)]
+        try:
+            results = await asyncio.gather(
+                measure_feed(feed_client, seconds),
+                *(login_loop(c, username, password, deadline) for c in login_client_pool)
+            )
+        finally:
+            for c in login_client_pool:
+                await c.aclose()
+
+    loaded, logins = results[0], sum(results[1:])
+    print("\nResults:")
+    summarize("Feed, idle", idle)
+    summarize("Feed, under login load", loaded)
+    print(f"  Logins: {logins} in {seconds:.0f}s ({logins / seconds:.1f}/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure feed latency under login load")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--login-clients", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.seconds, args.login_clients))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Fingerprint and pre-compress static assets
+
+Copies each file in static/ to static/dist/<name>.<hash><ext> along with
+.gz and (if the brotli package is installed) .br versions, and writes
+static/dist/manifest.json mapping original names to fingerprinted ones.
+Run it after changing anything in static/; the app picks up the manifest
+on start and serves dist/ files with long-lived immutable caching.
+
+    python build_static.py
+"""
+
+import gzip
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path(__file__).parent / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+
+# Already-compressed formats gain nothing from another pass
+SKIP_COMPRESSION = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".woff", ".woff2", ".mp3"}
+
+def build() -> dict:
+    """Build static/dist and return the manifest"""
+    if DIST_DIR.exists():
+        shutil.rmtree(DIST_DIR)
+    DIST_DIR.mkdir()
+
+    manifest = {}
+    for source in sorted(STATIC_DIR.rglob("*")):
+        if not source.is_file() or DIST_DIR in source.parents:
+            continue
+        content = source.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        relative = source.relative_to(STATIC_DIR)
+        target = DIST_DIR / relative.parent / f"{source.stem}.{digest}{source.suffix}"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+
+        sizes = [f"{len(content)}B"]
+        if source.suffix not in SKIP_COMPRESSION:
+            gz = gzip.compress(content, compresslevel=9, mtime=0)
+            target.with_name(target.name + ".gz").write_bytes(gz)
+            sizes.append(f"gzip {len(gz)}B")
+            if brotli:
+                br = brotli.compress(content, quality=11)
+                target.with_name(target.name + ".br").write_bytes(br)
+                sizes.append(f"br {len(br)}B")
+
+        manifest[relative.as_posix()] = target.relative_to(STATIC_DIR).as_posix()
+        print(f"  {relative} -> {manifest[relative.as_posix()]} ({', '.join(sizes)})")
+
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+def main():
+    print("Building static assets...")
+    manifest = build()
+    if not brotli:
+        print("\nNote: brotli is not installed, so only gzip versions were written")
+    print(f"\n✅ Built {len(manifest)} assets into {DIST_DIR}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Delete orphaned anonymous users left behind by per-visit account creation
+
+An anonymous user is orphaned when it has no password, has written no
+prayers and marked none, archived ones included. Its sessions are
+deleted along with it. Work is done in small batches, each in its own
+transaction, so the app keeps serving while this runs.
+"""
+
+import argparse
+import time
+from database import connect
+
+ORPHAN_QUERY = """
+    SELECT u.id FROM users u
+    WHERE u.display_name LIKE 'Anonymous\\_%' ESCAPE '\\'
+      AND u.password_hash IS NULL
+      AND NOT EXISTS (SELECT 1 FROM prayers p WHERE p.author_id = u.id)
+      AND NOT EXISTS (SELECT 1 FROM prayer_marks pm WHERE pm.user_id = u.id)
+      AND NOT EXISTS (SELECT 1 FROM prayers_archive pa WHERE pa.author_id = u.id)
+      AND NOT EXISTS (SELECT 1 FROM prayer_marks_archive pma WHERE pma.user_id = u.id)
+    LIMIT ?
+"""
+
+def cleanup_batch(conn, batch_size: int, dry_run: bool = False) -> int:
+    """Delete one batch of orphaned users, returning how many were found"""
+    user_ids = [row[0] for row in conn.execute(ORPHAN_QUERY, (batch_size,))]
+    if not user_ids or dry_run:
+        return len(user_ids)
+
+    placeholders = ",".join("?" * len(user_ids))
+    with conn:
+        conn.execute(f"DELETE FROM sessions WHERE user_id IN ({placeholders})", user_ids)
+        conn.execute(f"DELETE FROM users WHERE id IN ({placeholders})", user_ids)
+    return len(user_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Count the first batch without deleting")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.dry_run:
+            found = cleanup_batch(conn, args.batch_size, dry_run=True)
+            print(f"Would delete at least {found} orphaned anonymous users" if found == args.batch_size
+                  else f"Would delete {found} orphaned anonymous users")
+            return
+
+        total = 0
+        while True:
+            deleted = cleanup_batch(conn, args.batch_size)
+            total += deleted
+            if deleted:
+                print(f"  Deleted {total} orphaned anonymous users so far...")
+            if deleted < args.batch_size:
+                break
+            time.sleep(args.pause)
+
+        print(f"\n✅ Cleanup completed! Deleted {total} orphaned anonymous users")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Negotiated streaming compression for HTML and JSON responses.
+
+Uses brotli when the client accepts it and the brotli package is
+installed, gzip otherwise. Bodies are compressed chunk by chunk and
+flushed after each one, so streamed responses keep streaming. Left alone:
+responses under minimum_size, responses that already set a
+Content-Encoding (such as precompressed static files), and content types
+outside COMPRESSIBLE_TYPES. That includes text/event-stream, where
+buffering would hold back tokens.
+"""
+
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/html", "application/json", "text/css", "application/javascript", "text/plain")
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        # wbits 16+ produces a gzip container rather than raw zlib
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.process(data)
+        return out + (self._compressor.finish() if final else self._compressor.flush())
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _negotiate(self, accept_encoding: str):
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+        if brotli and "br" in accepted:
+            return "br", lambda: _BrotliCompressor(self.brotli_quality)
+        if "gzip" in accepted:
+            return "gzip", lambda: _GzipCompressor(self.gzip_level)
+        return None, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding, make_compressor = self._negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = make_compressor()
+                del headers["content-length"]
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                await send(start_message)
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_wrapper)
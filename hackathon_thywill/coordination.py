@@ -0,0 +1,137 @@
+"""
+Cross-process coordination for running PrayerLift under several workers.
+
+Every worker is a separate process with its own copy of the module-level
+services, so anything that must happen once, or be seen by everyone, goes
+through small files in STATE_DIR:
+
+- file_lock(name): blocking exclusive lock, e.g. around schema setup
+- Generation(name): a cheap "something changed" signal for in-process caches
+- leader: a non-blocking lock held for the life of one worker, which is the
+  only one allowed to run background jobs
+- SlotPool(name, size): a fixed number of permits, e.g. for global caps on
+  concurrent upstream calls
+"""
+
+import fcntl
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Optional
+
+STATE_DIR = Path(os.getenv("PRAYERLIFT_STATE_DIR", ".prayerlift_state"))
+
+def state_path(name: str) -> Path:
+    STATE_DIR.mkdir(exist_ok=True)
+    return STATE_DIR / name
+
+@contextmanager
+def file_lock(name: str):
+    """Hold an exclusive lock shared by every process on this host"""
+    with open(state_path(f"{name}.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+class Generation:
+    """Change counter for one cache, visible to all workers
+
+    A writer calls bump() after changing the data behind the cache; readers
+    call is_stale() (a single stat, no database access) and rebuild when it
+    returns True, then call mark_seen().
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._seen = None
+
+    def _stamp(self):
+        try:
+            st = os.stat(state_path(f"{self.name}.gen"))
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    def bump(self, seen: bool = True) -> None:
+        """Signal other workers; with seen=True our own copy counts as fresh
+
+        If another worker bumped since we last looked, our copy stays stale
+        so their change is still picked up.
+        """
+        was_fresh = not self.is_stale()
+        path = state_path(f"{self.name}.gen")
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(uuid.uuid4().hex)
+        # Replacing gives the file a new inode, so every bump is detectable
+        os.replace(tmp, path)
+        if seen and was_fresh:
+            self.mark_seen()
+
+    def is_stale(self) -> bool:
+        return self._stamp() != self._seen
+
+    def mark_seen(self) -> None:
+        self._seen = self._stamp()
+
+class LeaderLock:
+    """Non-blocking lock that elects a single worker to run background jobs"""
+
+    def __init__(self, name: str = "leader"):
+        self.name = name
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Try to become leader; returns True if this process holds the lock"""
+        if self._file:
+            return True
+        f = open(state_path(f"{self.name}.lock"), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self) -> None:
+        if self._file:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+class SlotPool:
+    """`size` numbered locks shared by every worker; holding one is a permit
+
+    flock locks are released by the kernel when their holder exits, so a
+    crashed worker never leaks a slot.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+
+    def try_acquire(self) -> Optional[IO]:
+        """Take a free slot without waiting; returns its handle, or None if all are held"""
+        for i in range(self.size):
+            f = open(state_path(f"{self.name}.{i}.slot"), "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            return f
+        return None
+
+    def release(self, slot: IO) -> None:
+        fcntl.flock(slot, fcntl.LOCK_UN)
+        slot.close()
+
+# Global leader lock for this process
+leader = LeaderLock()
@@ -0,0 +1,28 @@
+import sqlite3
+import os
+
+# Database setup
+DATABASE_PATH = os.getenv("DATABASE_PATH", "database.db")
+
+# How long a connection waits on another worker's write lock before failing
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def connect(path: str = None) -> sqlite3.Connection:
+    """Open a connection tuned for many concurrent workers sharing one file"""
+    conn = sqlite3.connect(path or DATABASE_PATH, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers keep going while one writer commits; NORMAL sync is
+    # durable across application crashes and much cheaper per commit
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+def get_db():
+    """Get database connection with thread-safe settings"""
+    conn = connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,305 @@
+"""
+In-process materialized view of the prayer feed.
+
+The feed is read far more often than it is written, so each worker keeps
+every prayer, its author's name and the ids of users who marked it in
+memory and serves feed pages without touching SQLite. Writes go to the
+database first and are then applied here in place.
+
+Other workers notice a change through the shared "feed" Generation and
+catch up with refresh(), which reads only the prayers whose change_seq is
+past the last one seen. Bulk removals by the archive job bump
+"feed-reset" instead; that rebuilds the index on a background thread
+while the old snapshot keeps serving.
+"""
+
+import bisect
+import os
+import sys
+import threading
+from typing import Optional
+from coordination import Generation
+from database import connect
+
+# Prayer ids per "IN (...)" query, well under SQLite's variable limit
+ID_BATCH_SIZE = 500
+
+PRAYER_QUERY = """
+    SELECT p.id, p.text, p.author_id, p.created_at, p.generated_prayer, u.display_name, p.change_seq
+    FROM prayers p
+    LEFT JOIN users u ON p.author_id = u.id
+"""
+
+class PrayerRecord:
+    """Compact feed entry; the author's name lives in FeedIndex.names"""
+    __slots__ = ("id", "text", "author_id", "created_at", "generated_prayer", "marked_by")
+
+    def __init__(self, id, text, author_id, created_at, generated_prayer=None):
+        self.id = id
+        self.text = text
+        self.author_id = author_id
+        self.created_at = created_at
+        self.generated_prayer = generated_prayer
+        self.marked_by = None      # set of user ids, created on first mark
+
+    @property
+    def prayer_count(self) -> int:
+        return len(self.marked_by) if self.marked_by else 0
+
+def _record_bytes(r: PrayerRecord) -> int:
+    """Approximate bytes held by one record, its strings and its mark set"""
+    size = sys.getsizeof(r) + sum(
+        sys.getsizeof(getattr(r, slot)) for slot in ("id", "text", "created_at", "generated_prayer")
+    )
+    return size + (sys.getsizeof(r.marked_by) if r.marked_by is not None else 0)
+
+def _sort_key(record: PrayerRecord):
+    # Same ordering as ORDER BY created_at (string comparison) with id as tiebreak
+    return (record.created_at or "", record.id)
+
+def _read_marks(cursor, prayer_ids: list[str]) -> dict:
+    """Return prayer id -> set of user ids who marked it, for the given prayers"""
+    marked_by = {}
+    for i in range(0, len(prayer_ids), ID_BATCH_SIZE):
+        batch = prayer_ids[i:i + ID_BATCH_SIZE]
+        cursor.execute(
+            f"SELECT prayer_id, user_id FROM prayer_marks WHERE prayer_id IN ({','.join('?' * len(batch))})",
+            batch
+        )
+        for prayer_id, user_id in cursor:
+            marked_by.setdefault(prayer_id, set()).add(user_id)
+    return marked_by
+
+class FeedIndex:
+    def __init__(self):
+        self.enabled = os.getenv("FEED_INDEX", "1") == "1"
+        self.loaded = False
+        self.records = []          # oldest first; pages are read from the end
+        self.by_id = {}            # prayer id -> PrayerRecord
+        self.names = {}            # author id -> display name
+        self.last_seq = 0          # highest change_seq applied
+        # Running totals for memory_usage(), kept current on every change
+        self._record_bytes = 0
+        self._name_bytes = 0
+        self._mark_count = 0
+        self.generation = Generation("feed")
+        self.reset_generation = Generation("feed-reset")
+        self._lock = threading.RLock()          # guards the in-memory structures
+        self._sync_lock = threading.Lock()      # serializes loads and deltas, guards last_seq
+        self._reloading = False
+
+    @property
+    def ready(self) -> bool:
+        return self.enabled and self.loaded
+
+    def is_stale(self) -> bool:
+        return self.generation.is_stale() or self.reset_generation.is_stale()
+
+    def load(self, db=None) -> None:
+        """(Re)build the index from the database, then swap it in"""
+        conn = db or connect()
+        try:
+            # Mark seen before reading so a write that lands mid-load
+            # leaves us stale rather than silently missing it
+            self.reset_generation.mark_seen()
+            cursor = conn.cursor()
+            # Read the counter first: rows changed after it are replayed below
+            cursor.execute("SELECT seq FROM change_counter")
+            seq = cursor.fetchone()[0]
+            cursor.execute(PRAYER_QUERY)
+            records, names = [], {}
+            for row in cursor:
+                records.append(PrayerRecord(row[0], row[1], row[2], row[3], row[4]))
+                if row[2] is not None:
+                    names[row[2]] = row[5]
+            records.sort(key=_sort_key)
+            by_id = {r.id: r for r in records}
+
+            cursor.execute("SELECT user_id, prayer_id FROM prayer_marks")
+            for user_id, prayer_id in cursor:
+                record = by_id.get(prayer_id)
+                if record:
+                    if record.marked_by is None:
+                        record.marked_by = set()
+                    record.marked_by.add(user_id)
+
+            record_bytes = sum(_record_bytes(r) for r in records)
+            name_bytes = sum(sys.getsizeof(n) for n in names.values())
+            mark_count = sum(r.prayer_count for r in records)
+
+            with self._sync_lock:
+                with self._lock:
+                    self.records, self.by_id, self.names = records, by_id, names
+                    self._record_bytes, self._name_bytes, self._mark_count = record_bytes, name_bytes, mark_count
+                    self.loaded = True
+                self.last_seq = seq
+                self._apply_changes(conn)
+        finally:
+            if db is None:
+                conn.close()
+
+    def _background_load(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Feed index reload failed: {e}")
+        finally:
+            self._reloading = False
+
+    def _apply_changes(self, conn) -> int:
+        """Apply prayers changed since last_seq; caller holds _sync_lock"""
+        self.generation.mark_seen()
+        cursor = conn.cursor()
+        cursor.execute(f"{PRAYER_QUERY} WHERE p.change_seq > ? ORDER BY p.change_seq", (self.last_seq,))
+        rows = cursor.fetchall()
+        if not rows:
+            return 0
+        marked_by = _read_marks(cursor, [row[0] for row in rows])
+
+        with self._lock:
+            for row in rows:
+                record = self.by_id.get(row[0])
+                if record is None:
+                    record = PrayerRecord(row[0], row[1], row[2], row[3], row[4])
+                    bisect.insort(self.records, record, key=_sort_key)
+                    self.by_id[row[0]] = record
+                else:
+                    self._forget(record)
+                    record.text, record.author_id, record.generated_prayer = row[1], row[2], row[4]
+                record.marked_by = marked_by.get(row[0])
+                self._count(record)
+                if row[2] is not None:
+                    self._set_name(row[2], row[5])
+        self.last_seq = rows[-1][6]
+        return len(rows)
+
+    def refresh(self) -> None:
+        """Catch up with writes from other workers
+
+        Blocks only for the small change_seq delta; a full rebuild after
+        an archive run happens on a background thread while the current
+        snapshot keeps serving.
+        """
+        if self.reset_generation.is_stale() and not self._reloading:
+            self._reloading = True
+            threading.Thread(target=self._background_load, daemon=True).start()
+        if self.generation.is_stale():
+            conn = connect()
+            try:
+                with self._sync_lock:
+                    self._apply_changes(conn)
+            finally:
+                conn.close()
+
+    def _changed(self) -> None:
+        self.generation.bump()
+
+    def _row(self, r: PrayerRecord, user_id: Optional[str]) -> dict:
+        return {
+            "id": r.id,
+            "text": r.text,
+            "author_id": r.author_id,
+            "created_at": r.created_at,
+            "generated_prayer": r.generated_prayer,
+            "display_name": self.names.get(r.author_id),
+            "prayer_count": r.prayer_count,
+            "user_marked": 1 if r.marked_by and user_id in r.marked_by else 0,
+        }
+
+    def page(self, user_id: Optional[str], offset: int, limit: int) -> tuple[list[dict], int]:
+        """Return (prayers newest first, total count) shaped like the feed query rows"""
+        with self._lock:
+            total = len(self.records)
+            end = max(total - offset, 0)
+            start = max(end - limit, 0)
+            prayers = [self._row(r, user_id) for r in reversed(self.records[start:end])]
+            return prayers, total
+
+    def rows(self, prayer_ids: list[str], user_id: Optional[str]) -> list[dict]:
+        """Feed rows for prayer_ids in the order given, skipping any not in the index"""
+        with self._lock:
+            return [self._row(self.by_id[i], user_id) for i in prayer_ids if i in self.by_id]
+
+    def _forget(self, record: PrayerRecord) -> None:
+        """Take a record out of the running totals before changing it; caller holds _lock"""
+        self._record_bytes -= _record_bytes(record)
+        self._mark_count -= record.prayer_count
+
+    def _count(self, record: PrayerRecord) -> None:
+        self._record_bytes += _record_bytes(record)
+        self._mark_count += record.prayer_count
+
+    def _set_name(self, author_id: str, name: str) -> None:
+        old = self.names.get(author_id)
+        if old is not None:
+            self._name_bytes -= sys.getsizeof(old)
+        self.names[author_id] = name
+        self._name_bytes += sys.getsizeof(name)
+
+    def add_prayer(self, prayer_id: str, text: str, author_id: str, display_name: str, created_at: str) -> None:
+        if not self.ready:
+            return
+        with self._lock:
+            if prayer_id not in self.by_id:
+                record = PrayerRecord(prayer_id, text, author_id, created_at)
+                bisect.insort(self.records, record, key=_sort_key)
+                self.by_id[prayer_id] = record
+                self._count(record)
+            self._set_name(author_id, display_name)
+            self._changed()
+
+    def set_generated(self, prayer_id: str, generated_prayer: str) -> None:
+        if not self.ready:
+            return
+        with self._lock:
+            record = self.by_id.get(prayer_id)
+            if record:
+                self._forget(record)
+                record.generated_prayer = generated_prayer
+                self._count(record)
+            self._changed()
+
+    def mark(self, user_id: str, prayer_id: str) -> None:
+        if not self.ready:
+            return
+        with self._lock:
+            record = self.by_id.get(prayer_id)
+            if record:
+                self._forget(record)
+                if record.marked_by is None:
+                    record.marked_by = set()
+                record.marked_by.add(user_id)
+                self._count(record)
+            self._changed()
+
+    def unmark(self, user_id: str, prayer_id: str) -> None:
+        if not self.ready:
+            return
+        with self._lock:
+            record = self.by_id.get(prayer_id)
+            if record and record.marked_by:
+                self._forget(record)
+                record.marked_by.discard(user_id)
+                self._count(record)
+            self._changed()
+
+    def memory_usage(self) -> dict:
+        """Approximate bytes held by the index, in total and per prayer
+
+        Reads running totals, so it costs the same however large the feed.
+        """
+        with self._lock:
+            total = (
+                self._record_bytes + self._name_bytes
+                + sys.getsizeof(self.records) + sys.getsizeof(self.by_id) + sys.getsizeof(self.names)
+            )
+            count = len(self.records)
+            return {
+                "prayers": count,
+                "marks": self._mark_count,
+                "total_bytes": total,
+                "bytes_per_prayer": round(total / count) if count else 0,
+            }
+
+# Global feed index instance
+feed_index = FeedIndex()
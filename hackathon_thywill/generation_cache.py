@@ -0,0 +1,179 @@
+"""
+Persistent cache of AI prayer responses.
+
+Retries, backfills and duplicate submissions (double-clicks, spam) send
+the same request to Claude again. Responses are stored in the
+generation_cache table under a hash of the normalized request text,
+author name, prompt template version and model, so repeats are answered
+locally. The least recently used entries are evicted once the table
+holds more than GENERATION_CACHE_MAX_ENTRIES.
+
+Identical requests that arrive together (a double-click reaching two
+workers) share one generation: the first claims the key, in memory for
+this worker and in generation_claims for the others, and the rest wait
+for its response.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Optional
+from database import connect
+
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "10000"))
+
+# A claim outlives the slowest generation (the streaming timeout is 30s);
+# after that a crashed worker's claim is taken over
+GENERATION_CLAIM_SECONDS = 45
+CLAIM_POLL_SECONDS = 0.2
+
+# Cache hits update last_used_at in one batch per this many keys or seconds
+TOUCH_FLUSH_SIZE = 100
+TOUCH_FLUSH_SECONDS = 60
+
+def normalize_request(text: str) -> str:
+    """Collapse whitespace and case so trivially different repeats share an entry"""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+def cache_key(prayer_request: str, author_name: str, template_version: str, model: str) -> str:
+    parts = [normalize_request(prayer_request), author_name.strip(), template_version, model]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+class GenerationCache:
+    def __init__(self, max_entries: int = GENERATION_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._in_flight = {}       # key -> Future of a generation running in this worker
+        self._touched = {}         # key -> last_used_at not yet written
+        self._last_flush = time.monotonic()
+
+    def get(self, key: str) -> Optional[str]:
+        conn = connect()
+        try:
+            row = conn.execute("SELECT response FROM generation_cache WHERE key = ?", (key,)).fetchone()
+        except Exception as e:
+            # A cache failure should never stop a prayer from being generated
+            print(f"Generation cache read failed: {e}")
+            return None
+        finally:
+            conn.close()
+        if row:
+            self._touch(key)
+            return row[0]
+        return None
+
+    def _touch(self, key: str) -> None:
+        """Record a hit; last_used_at is written in batches so hits stay read-only"""
+        with self._lock:
+            self._touched[key] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            due = (
+                len(self._touched) >= TOUCH_FLUSH_SIZE
+                or time.monotonic() - self._last_flush >= TOUCH_FLUSH_SECONDS
+            )
+            if not due:
+                return
+            touched, self._touched = self._touched, {}
+            self._last_flush = time.monotonic()
+        conn = connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE generation_cache SET last_used_at = ? WHERE key = ?",
+                    [(used_at, key) for key, used_at in touched.items()]
+                )
+        except Exception as e:
+            print(f"Generation cache touch failed: {e}")
+        finally:
+            conn.close()
+
+    def set(self, key: str, response: str) -> None:
+        conn = connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO generation_cache (key, response) VALUES (?, ?)",
+                    (key, response)
+                )
+                conn.execute("""
+                    DELETE FROM generation_cache WHERE key IN (
+                        SELECT key FROM generation_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,))
+        except Exception as e:
+            print(f"Generation cache write failed: {e}")
+        finally:
+            conn.close()
+
+    def claim(self, key: str) -> Optional[Future]:
+        """Claim key for generation in this worker
+
+        Returns None if the caller should generate, in which case it must
+        call release() when done. Otherwise returns the Future of the same
+        generation already running here, which resolves to its response.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future:
+                return future
+            self._in_flight[key] = Future()
+        return None
+
+    def wait_for_other_workers(self, key: str) -> Optional[str]:
+        """Take the shared claim on a key this worker has claimed
+
+        If another worker holds it, waits for that worker's response and
+        returns it. Returns None once the caller holds the claim and should
+        generate, including when the other worker gave up without caching.
+        """
+        while True:
+            if self._take_shared_claim(key):
+                # Another worker may have finished between our miss and the claim
+                return self.get(key)
+            time.sleep(CLAIM_POLL_SECONDS)
+            response = self.get(key)
+            if response:
+                return response
+
+    def _take_shared_claim(self, key: str) -> bool:
+        now = time.time()
+        conn = connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM generation_claims WHERE key = ? AND expires_at < ?", (key, now))
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO generation_claims (key, expires_at) VALUES (?, ?)",
+                    (key, now + GENERATION_CLAIM_SECONDS)
+                )
+                return cursor.rowcount == 1
+        except Exception as e:
+            # Without the shared claim we may duplicate a call, never block one
+            print(f"Generation claim failed: {e}")
+            return True
+        finally:
+            conn.close()
+
+    def release(self, key: str, response: Optional[str], cache: bool = True) -> None:
+        """Finish a claimed generation: store the response if cacheable, then wake waiters"""
+        try:
+            if cache and response:
+                self.set(key, response)
+            conn = connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM generation_claims WHERE key = ?", (key,))
+            except Exception as e:
+                print(f"Generation claim release failed: {e}")
+            finally:
+                conn.close()
+        finally:
+            with self._lock:
+                future = self._in_flight.pop(key)
+            future.set_result(response)
+
+# Global cache instance
+generation_cache = GenerationCache()
@@ -0,0 +1,23 @@
+"""
+Gunicorn settings for multi-worker serving:
+
+    gunicorn main:app -c gunicorn.conf.py
+
+Each worker is a separate uvicorn event loop, so throughput scales with
+CPU cores. Override the worker count with WEB_CONCURRENCY.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# AI and TTS calls can take a while; don't let gunicorn kill busy workers
+timeout = 60
+graceful_timeout = 30
+
+def on_starting(server):
+    """Apply migrations once in the master before any worker is forked"""
+    from migrate import migrate
+    migrate()
@@ -1,130 +1,187 @@
 from fastapi import FastAPI, Request, Form, Depends, HTTPException, status, Response, Cookie
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 import sqlite3
 import uuid
+import json
 from datetime import datetime
 import os
-from ai_service import ai_service
+from typing import Optional
+from ai_service import ai_service, IncompleteResponseError
 from tts_service import tts_service
-from auth import get_current_user_optional, get_or_create_session_user, require_auth, create_session, hash_password, verify_password
+from auth import get_current_user_optional, get_session_user, persist_anonymous_user, set_identity_cookies, require_auth, create_session, hash_password_async, verify_and_update_password_async, delete_expired_sessions
+from database import get_db, connect
+from migrate import migrate
+from coordination import leader
+from feed_index import feed_index
+from rate_limit import rate_limit, claude_gate, tts_gate
+from api import router as api_router
+from compression import CompressionMiddleware
+from static_assets import PrecompressedStaticFiles, asset_url
+from archive import archive_old_prayers, archived_feed_page, has_archived_prayers, marks_table
+from scores import on_mark, on_unmark, refresh_scores, NEEDS_PRAYER_WINDOW_DAYS
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
 
-app = FastAPI(title="PrayerLift")
+# Background jobs: (interval in seconds, callable). Only the leader worker runs them.
+BACKGROUND_JOBS = [
+    (60 * 60, delete_expired_sessions),
+    (10 * 60, refresh_scores),
+    (24 * 60 * 60, archive_old_prayers),
+]
+LEADER_POLL_SECONDS = 30
 
-# Mount static files and templates
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+async def run_background_jobs():
+    """Run periodic jobs in exactly one worker
 
-# Database setup
-DATABASE_PATH = "database.db"
+    Every worker keeps polling for the leader lock, so if the leader exits
+    another worker takes over within LEADER_POLL_SECONDS.
+    """
+    loop = asyncio.get_running_loop()
+    last_run = {}
+    while True:
+        if leader.acquire():
+            for interval, job in BACKGROUND_JOBS:
+                if loop.time() - last_run.get(job, float("-inf")) >= interval:
+                    last_run[job] = loop.time()
+                    try:
+                        await run_in_threadpool(job)
+                    except Exception as e:
+                        print(f"Background job {job.__name__} failed: {e}")
+        await asyncio.sleep(LEADER_POLL_SECONDS)
 
-def init_db():
-    """Initialize the database with required tables"""
-    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id TEXT PRIMARY KEY,
-            display_name TEXT UNIQUE,
-            password_hash TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create prayers table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS prayers (
-            id TEXT PRIMARY KEY,
-            text TEXT NOT NULL,
-            author_id TEXT REFERENCES users(id),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            generated_prayer TEXT
-        )
-    """)
-    
-    # Create prayer_marks table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS prayer_marks (
-            user_id TEXT REFERENCES users(id),
-            prayer_id TEXT REFERENCES prayers(id),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (user_id, prayer_id)
-        )
-    """)
-    
-    # Create sessions table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            id TEXT PRIMARY KEY,
-            user_id TEXT REFERENCES users(id),
-            expires_at TIMESTAMP
-        )
-    """)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Explicit startup and shutdown; nothing touches the database at import time"""
+    started = time.perf_counter()
+    applied = await run_in_threadpool(migrate)
+    if applied:
+        print(f"Applied migrations: {', '.join(applied)}")
+    if feed_index.enabled:
+        await run_in_threadpool(feed_index.load)
+        print(f"Feed index loaded: {feed_index.memory_usage()}")
+    background_task = asyncio.create_task(run_background_jobs())
+    print(f"Startup completed in {(time.perf_counter() - started) * 1000:.1f}ms")
     
-    conn.commit()
-    conn.close()
+    yield
+    
+    background_task.cancel()
+    leader.release()
 
-# Initialize database on startup
-init_db()
+app = FastAPI(title="PrayerLift", lifespan=lifespan)
+app.include_router(api_router)
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")))
 
-def get_db():
-    """Get database connection with thread-safe settings"""
-    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+# Mount static files and templates
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
+templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url
+
+PAGE_SIZE = 50
+
+# Feed orderings other than newest-first: (source, filter, ordering). "needs"
+# reads only its window off the created_at index and sorts that bounded
+# set; scanning the needs_score index instead would walk every older
+# prayer, since those keep their last (lowest) score forever
+RANKED_FEEDS = {
+    "trending": ("prayers p", "", "p.trending_score DESC"),
+    "needs": (
+        "prayers p INDEXED BY idx_prayers_created_at",
+        f"WHERE p.created_at >= datetime('now', '-{NEEDS_PRAYER_WINDOW_DAYS} days')",
+        "p.needs_score ASC",
+    ),
+}
+
+def ranked_feed_page(db, sort: str, user_id: str, offset: int, limit: int) -> tuple[list, bool]:
+    """Return (prayers, has_more) for a ranked feed ordering"""
+    source, where, order_by = RANKED_FEEDS[sort]
+    cursor = db.cursor()
+    if feed_index.ready:
+        # Only the ordering comes from SQLite; counts, names and the user's
+        # marks are already in memory
+        cursor.execute(f"SELECT p.id FROM {source} {where} ORDER BY {order_by} LIMIT ? OFFSET ?", (limit + 1, offset))
+        prayer_ids = [row[0] for row in cursor.fetchall()]
+        return feed_index.rows(prayer_ids[:limit], user_id), len(prayer_ids) > limit
+    
+    # Fetch one extra row to learn whether there is a next page without a COUNT
+    cursor.execute(f"""
+        SELECT p.*, u.display_name,
+               (SELECT COUNT(*) FROM prayer_marks pm WHERE pm.prayer_id = p.id) as prayer_count,
+               EXISTS (SELECT 1 FROM prayer_marks upm WHERE upm.prayer_id = p.id AND upm.user_id = ?) as user_marked
+        FROM {source}
+        LEFT JOIN users u ON p.author_id = u.id
+        {where}
+        ORDER BY {order_by}
+        LIMIT ? OFFSET ?
+    """, (user_id, limit + 1, offset))
+    prayers = cursor.fetchall()
+    return prayers[:limit], len(prayers) > limit
 
 @app.get("/", response_class=HTMLResponse)
-async def prayer_feed(request: Request, session_id: str = Cookie(None), db = Depends(get_db)):
-    """Display the main prayer feed with auto-session creation"""
-    from fastapi import Response
+async def prayer_feed(request: Request, page: int = 1, sort: str = "recent", session_id: str = Cookie(None), visitor_id: str = Cookie(None), db = Depends(get_db)):
+    """Display the main prayer feed; anonymous visitors get a signed cookie, not a database row"""
+    current_user = get_session_user(session_id, visitor_id, db)
     
-    # Get or create user session
-    current_user, session_id = get_or_create_session_user(session_id, db)
+    page = max(page, 1)
+    offset = (page - 1) * PAGE_SIZE
     
-    cursor = db.cursor()
-    cursor.execute("""
-        SELECT p.*, u.display_name, 
-               COUNT(pm.prayer_id) as prayer_count,
-               CASE WHEN upm.prayer_id IS NOT NULL THEN 1 ELSE 0 END as user_marked
-        FROM prayers p 
-        LEFT JOIN users u ON p.author_id = u.id
-        LEFT JOIN prayer_marks pm ON p.id = pm.prayer_id
-        LEFT JOIN prayer_marks upm ON p.id = upm.prayer_id AND upm.user_id = ?
-        GROUP BY p.id
-        ORDER BY p.created_at DESC
-    """, (current_user["id"],))
+    if feed_index.ready and feed_index.is_stale():
+        await run_in_threadpool(feed_index.refresh)
     
-    prayers = cursor.fetchall()
+    if sort in RANKED_FEEDS:
+        prayers, has_more = ranked_feed_page(db, sort, current_user["id"], offset, PAGE_SIZE)
+    elif feed_index.ready:
+        sort = "recent"
+        prayers, total = feed_index.page(current_user["id"], offset, PAGE_SIZE)
+    else:
+        sort = "recent"
+        cursor = db.cursor()
+        cursor.execute("""
+            SELECT p.*, u.display_name, 
+                   COUNT(pm.prayer_id) as prayer_count,
+                   CASE WHEN upm.prayer_id IS NOT NULL THEN 1 ELSE 0 END as user_marked
+            FROM prayers p 
+            LEFT JOIN users u ON p.author_id = u.id
+            LEFT JOIN prayer_marks pm ON p.id = pm.prayer_id
+            LEFT JOIN prayer_marks upm ON p.id = upm.prayer_id AND upm.user_id = ?
+            GROUP BY p.id
+            ORDER BY p.created_at DESC
+            LIMIT ? OFFSET ?
+        """, (current_user["id"], PAGE_SIZE, offset))
+        prayers = cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) FROM prayers")
+        total = cursor.fetchone()[0]
+    
+    if sort == "recent":
+        has_more = offset + len(prayers) < total
+        # Once paging runs past the hot prayers, continue into the archive
+        if len(prayers) < PAGE_SIZE:
+            archived, has_more = archived_feed_page(
+                db, current_user["id"], max(offset - total, 0), PAGE_SIZE - len(prayers)
+            )
+            prayers = list(prayers) + archived
+        elif not has_more:
+            has_more = has_archived_prayers(db)
     
     response = templates.TemplateResponse("index.html", {
         "request": request, 
         "prayers": prayers,
-        "current_user": current_user
+        "current_user": current_user,
+        "page": page,
+        "sort": sort,
+        "has_more": has_more
     })
     
-    # Set session cookie if new session was created
-    if not request.cookies.get("session_id"):
-        response.set_cookie(key="session_id", value=session_id, httponly=True, max_age=30*24*60*60)
+    set_identity_cookies(response, current_user, visitor_id)
     
     return response
 
-@app.post("/prayers")
-async def submit_prayer(
-    request: Request,
-    prayer_text: str = Form(...),
-    author_name: str = Form(...),
-    session_id: str = Cookie(None),
-    db = Depends(get_db)
-):
-    """Submit a new prayer request"""
-    # Get or create user session
-    current_user, _ = get_or_create_session_user(session_id, db)
+def create_prayer(current_user: dict, prayer_text: str, author_name: str, db) -> tuple[str, str, Optional[str]]:
+    """Save a new prayer, returning (prayer_id, author_name, new_session_id)"""
+    # First write from an anonymous visitor creates their user and session
+    new_session_id = persist_anonymous_user(current_user, db)
     
     cursor = db.cursor()
     
@@ -135,6 +192,7 @@ async def submit_prayer(
                 "UPDATE users SET display_name = ? WHERE id = ?",
                 (author_name.strip(), current_user["id"])
             )
+            author_name = author_name.strip()
         except sqlite3.IntegrityError:
             # Name already taken, keep the old name
             author_name = current_user["display_name"]
@@ -147,22 +205,149 @@ async def submit_prayer(
         "INSERT INTO prayers (id, text, author_id) VALUES (?, ?, ?)",
         (prayer_id, prayer_text, user_id)
     )
+    db.commit()
     
+    cursor.execute("SELECT created_at FROM prayers WHERE id = ?", (prayer_id,))
+    feed_index.add_prayer(prayer_id, prayer_text, user_id, author_name, cursor.fetchone()[0])
+    
+    return prayer_id, author_name, new_session_id
+
+def save_generated_prayer(prayer_id: str, generated_prayer: str, db) -> None:
+    """Store the AI prayer response for a prayer"""
+    db.execute(
+        "UPDATE prayers SET generated_prayer = ? WHERE id = ?",
+        (generated_prayer, prayer_id)
+    )
     db.commit()
+    feed_index.set_generated(prayer_id, generated_prayer)
+
+prayer_rate_limit = rate_limit("prayers", per_session="5/60", per_ip="20/60")
+
+@app.post("/prayers", dependencies=[Depends(prayer_rate_limit)])
+async def submit_prayer(
+    request: Request,
+    prayer_text: str = Form(...),
+    author_name: str = Form(...),
+    session_id: str = Cookie(None),
+    visitor_id: str = Cookie(None),
+    db = Depends(get_db)
+):
+    """Submit a new prayer request"""
+    current_user = get_session_user(session_id, visitor_id, db)
+    
+    # A repeat of an earlier request is answered from the cache, without a generation slot
+    cached = await run_in_threadpool(ai_service.cached_prayer_response, prayer_text, author_name.strip())
+    if cached:
+        prayer_id, author_name, new_session_id = create_prayer(current_user, prayer_text, author_name, db)
+        save_generated_prayer(prayer_id, cached, db)
+        response = RedirectResponse(url="/", status_code=303)
+        set_identity_cookies(response, current_user, visitor_id, new_session_id)
+        return response
     
-    # Generate AI prayer response
+    # Hold a generation slot for the whole request so an overloaded
+    # service sheds the submission before anything is saved
+    async with claude_gate.slot():
+        prayer_id, author_name, new_session_id = create_prayer(current_user, prayer_text, author_name, db)
+        
+        # Generate AI prayer response off the event loop
+        try:
+            generated_prayer = await run_in_threadpool(ai_service.generate_prayer_response, prayer_text, author_name)
+            if generated_prayer:
+                save_generated_prayer(prayer_id, generated_prayer, db)
+        except Exception as e:
+            print(f"Failed to generate AI prayer: {e}")
+    
+    response = RedirectResponse(url="/", status_code=303)
+    set_identity_cookies(response, current_user, visitor_id, new_session_id)
+    return response
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Streaming generations in flight; held so they aren't garbage collected mid-run
+generation_tasks = set()
+
+async def generate_and_save(prayer_id: str, prayer_text: str, author_name: str, slot, queue: asyncio.Queue) -> None:
+    """Stream the AI response into queue and store it, releasing the gate slot when done
+
+    Runs as its own task, so a client disconnecting only stops the reader;
+    the prayer still gets its full generated response.
+    """
+    chunks = []
     try:
-        generated_prayer = ai_service.generate_prayer_response(prayer_text, author_name)
+        try:
+            async for chunk in ai_service.stream_prayer_response(prayer_text, author_name):
+                chunks.append(chunk)
+                queue.put_nowait(("token", chunk))
+            generated_prayer = "".join(chunks).strip()
+        except IncompleteResponseError:
+            # Never store a truncated prayer; fetch a whole one instead
+            generated_prayer = await run_in_threadpool(ai_service.generate_prayer_response, prayer_text, author_name)
+        
         if generated_prayer:
-            cursor.execute(
-                "UPDATE prayers SET generated_prayer = ? WHERE id = ?",
-                (generated_prayer, prayer_id)
-            )
-            db.commit()
+            # Fresh connection, since the request's is closed once the response starts
+            conn = connect()
+            try:
+                await run_in_threadpool(save_generated_prayer, prayer_id, generated_prayer, conn)
+            finally:
+                conn.close()
     except Exception as e:
         print(f"Failed to generate AI prayer: {e}")
+        generated_prayer = None
+    finally:
+        claude_gate.release(slot)
+        queue.put_nowait(("done", generated_prayer))
+
+@app.post("/prayers/stream", dependencies=[Depends(prayer_rate_limit)])
+async def submit_prayer_streaming(
+    prayer_text: str = Form(...),
+    author_name: str = Form(...),
+    session_id: str = Cookie(None),
+    visitor_id: str = Cookie(None),
+    db = Depends(get_db)
+):
+    """Submit a prayer and stream the AI response to the browser as it is generated
+
+    Events: "prayer" with the saved prayer, "token" for each text chunk, and
+    "done" with the stored response once it has been saved.
+    """
+    current_user = get_session_user(session_id, visitor_id, db)
+    
+    # A repeat of an earlier request is answered from the cache, without a generation slot
+    cached = await run_in_threadpool(ai_service.cached_prayer_response, prayer_text, author_name.strip())
+    
+    # Otherwise take the slot before the response starts, while a 503 can still be sent
+    slot = None if cached else await claude_gate.acquire()
+    try:
+        prayer_id, author_name, new_session_id = create_prayer(current_user, prayer_text, author_name, db)
+    except Exception:
+        if slot:
+            claude_gate.release(slot)
+        raise
+    
+    queue = asyncio.Queue()
+    if cached:
+        save_generated_prayer(prayer_id, cached, db)
+        queue.put_nowait(("token", cached))
+        queue.put_nowait(("done", cached))
+    else:
+        task = asyncio.create_task(generate_and_save(prayer_id, prayer_text, author_name, slot, queue))
+        generation_tasks.add(task)
+        task.add_done_callback(generation_tasks.discard)
+    
+    async def events():
+        yield sse_event("prayer", {"id": prayer_id, "text": prayer_text, "author": author_name})
+        while True:
+            kind, text = await queue.get()
+            if kind == "done":
+                yield sse_event("done", {"id": prayer_id, "text": text})
+                break
+            yield sse_event("token", {"text": text})
     
-    return RedirectResponse(url="/", status_code=303)
+    response = StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    set_identity_cookies(response, current_user, visitor_id, new_session_id)
+    return response
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
@@ -181,7 +366,14 @@ async def login(
     cursor.execute("SELECT id, password_hash FROM users WHERE display_name = ?", (username,))
     user = cursor.fetchone()
     
-    if user and verify_password(password, user[1]):
+    # Unknown users still go through bcrypt, so response time doesn't reveal which names exist
+    valid, new_hash = await verify_and_update_password_async(password, user[1] if user else None)
+    
+    if valid:
+        # Transparently upgrade legacy SHA-256 hashes to bcrypt
+        if new_hash:
+            cursor.execute("UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, user[0]))
+            db.commit()
         session_id = create_session(user[0], db)
         response = RedirectResponse(url="/", status_code=303)
         response.set_cookie(key="session_id", value=session_id, httponly=True, max_age=30*24*60*60)
@@ -209,7 +401,7 @@ async def register(
     
     try:
         user_id = str(uuid.uuid4())
-        password_hash = hash_password(password)
+        password_hash = await hash_password_async(password)
         cursor.execute(
             "INSERT INTO users (id, display_name, password_hash) VALUES (?, ?, ?)",
             (user_id, username, password_hash)
@@ -232,26 +424,34 @@ async def logout(response: Response):
     """Handle logout"""
     response = RedirectResponse(url="/", status_code=303)
     response.delete_cookie("session_id")
+    response.delete_cookie("visitor_id")
     return response
 
 @app.post("/mark/{prayer_id}")
 async def mark_prayer(
     prayer_id: str,
+    response: Response,
     session_id: str = Cookie(None),
+    visitor_id: str = Cookie(None),
     db = Depends(get_db)
 ):
     """Mark that user has prayed for this prayer"""
-    # Get or create user session  
-    current_user, _ = get_or_create_session_user(session_id, db)
+    current_user = get_session_user(session_id, visitor_id, db)
     
     cursor = db.cursor()
     
     try:
+        new_session_id = persist_anonymous_user(current_user, db)
+        set_identity_cookies(response, current_user, visitor_id, new_session_id)
+        table = marks_table(db, prayer_id)
         cursor.execute(
-            "INSERT OR IGNORE INTO prayer_marks (user_id, prayer_id) VALUES (?, ?)",
+            f"INSERT OR IGNORE INTO {table} (user_id, prayer_id) VALUES (?, ?)",
             (current_user["id"], prayer_id)
         )
+        if cursor.rowcount and table == "prayer_marks":
+            on_mark(db, prayer_id)
         db.commit()
+        feed_index.mark(current_user["id"], prayer_id)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -260,30 +460,45 @@ async def mark_prayer(
 async def unmark_prayer(
     prayer_id: str,
     session_id: str = Cookie(None),
+    visitor_id: str = Cookie(None),
     db = Depends(get_db)
 ):
     """Remove prayer mark"""
-    # Get or create user session
-    current_user, _ = get_or_create_session_user(session_id, db)
+    current_user = get_session_user(session_id, visitor_id, db)
     
+    # Look marks up by id even for visitors without a live session: their
+    # session may have expired while the visitor cookie and marks remain
     cursor = db.cursor()
     
     try:
+        table = marks_table(db, prayer_id)
         cursor.execute(
-            "DELETE FROM prayer_marks WHERE user_id = ? AND prayer_id = ?",
+            f"SELECT created_at FROM {table} WHERE user_id = ? AND prayer_id = ?",
             (current_user["id"], prayer_id)
         )
-        db.commit()
+        mark = cursor.fetchone()
+        if mark:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE user_id = ? AND prayer_id = ?",
+                (current_user["id"], prayer_id)
+            )
+            if table == "prayer_marks":
+                on_unmark(db, prayer_id, mark[0])
+            db.commit()
+        feed_index.unmark(current_user["id"], prayer_id)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/audio/{prayer_id}")
+@app.get("/audio/{prayer_id}", dependencies=[Depends(rate_limit("audio", per_session="10/60", per_ip="30/60"))])
 async def get_prayer_audio(prayer_id: str, audio_type: str = "original", db = Depends(get_db)):
     """Generate and return audio for a prayer (original or generated)"""
     cursor = db.cursor()
     cursor.execute("SELECT text, generated_prayer FROM prayers WHERE id = ?", (prayer_id,))
     prayer = cursor.fetchone()
+    if not prayer:
+        cursor.execute("SELECT text, generated_prayer FROM prayers_archive WHERE id = ?", (prayer_id,))
+        prayer = cursor.fetchone()
     
     if not prayer:
         raise HTTPException(status_code=404, detail="Prayer not found")
@@ -294,14 +509,27 @@ async def get_prayer_audio(prayer_id: str, audio_type: str = "original", db = De
     else:
         text = prayer[0]
     
-    # Generate audio
-    audio_base64 = tts_service.generate_audio_base64(text)
+    # Replaying cached audio needs no upstream slot; only real generation is gated
+    audio_base64 = await run_in_threadpool(tts_service.get_cached_audio_base64, text)
+    if not audio_base64:
+        async with tts_gate.slot():
+            audio_base64 = await run_in_threadpool(tts_service.generate_audio_base64, text)
     
     if not audio_base64:
         raise HTTPException(status_code=503, detail="TTS service unavailable")
     
     return {"audio": audio_base64, "type": "audio/mpeg"}
 
+@app.get("/stats/feed-index")
+async def feed_index_stats():
+    """Report memory used by the in-process feed index"""
+    if not feed_index.ready:
+        return {"enabled": False}
+    return {"enabled": True, **feed_index.memory_usage()}
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # WEB_CONCURRENCY > 1 runs several worker processes; uvicorn needs an
+    # import string rather than the app object to spawn them
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
\ No newline at end of file
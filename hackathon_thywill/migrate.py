@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations
+
+Migrations are the NNN_name.sql files in migrations/, applied in order.
+Each one runs in its own transaction together with its schema_version
+row, so a failed migration leaves the database at the previous version.
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+"""
+
+import argparse
+import re
+import sqlite3
+from pathlib import Path
+from coordination import file_lock
+from database import connect
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+def available_migrations() -> list[tuple[int, str, Path]]:
+    """Return (version, name, path) for every migration file, in order"""
+    migrations = []
+    for path in MIGRATIONS_DIR.glob("*.sql"):
+        match = re.match(r"(\d+)_(.+)\.sql$", path.name)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), path))
+    return sorted(migrations)
+
+def current_version(conn) -> int:
+    """Highest applied migration version, or 0 for a fresh database"""
+    table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not table:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate() -> list[str]:
+    """Apply pending migrations, returning the names of those applied
+
+    Safe to call from every worker: the up-to-date case is a single read,
+    and otherwise a file lock ensures only one process applies migrations.
+    """
+    migrations = available_migrations()
+    latest = migrations[-1][0] if migrations else 0
+
+    conn = connect()
+    try:
+        if current_version(conn) >= latest:
+            return []
+
+        applied = []
+        with file_lock("schema"):
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+            # Re-read under the lock; another worker may have just finished
+            version = current_version(conn)
+            for number, name, path in migrations:
+                if number <= version:
+                    continue
+                print(f"Applying migration {number:03d}_{name}")
+                try:
+                    conn.executescript(
+                        "BEGIN;\n"
+                        f"{path.read_text()}\n"
+                        f"INSERT INTO schema_version (version, name) VALUES ({number}, '{name}');\n"
+                        "COMMIT;"
+                    )
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
+                applied.append(f"{number:03d}_{name}")
+        return applied
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply PrayerLift schema migrations")
+    parser.add_argument("--status", action="store_true", help="Show migration status without applying")
+    args = parser.parse_args()
+
+    if args.status:
+        conn = connect()
+        try:
+            version = current_version(conn)
+        finally:
+            conn.close()
+        for number, name, _ in available_migrations():
+            state = "applied" if number <= version else "pending"
+            print(f"  {number:03d}_{name}: {state}")
+        return
+
+    applied = migrate()
+    if applied:
+        print(f"\n✅ Applied {len(applied)} migration(s)")
+    else:
+        print("Database is up to date")
+
+if __name__ == "__main__":
+    main()
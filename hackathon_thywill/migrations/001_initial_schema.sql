@@ -0,0 +1,30 @@
+-- Tables as originally created by init_db(); IF NOT EXISTS lets this
+-- apply cleanly to databases that predate schema_version.
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    display_name TEXT UNIQUE,
+    password_hash TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS prayers (
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    author_id TEXT REFERENCES users(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    generated_prayer TEXT
+);
+
+CREATE TABLE IF NOT EXISTS prayer_marks (
+    user_id TEXT REFERENCES users(id),
+    prayer_id TEXT REFERENCES prayers(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, prayer_id)
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT REFERENCES users(id),
+    expires_at TIMESTAMP
+);
@@ -0,0 +1,8 @@
+-- Indexes for the feed ordering, per-prayer mark counts, author lookups
+-- and session cleanup. In WAL mode readers keep running while these build.
+
+CREATE INDEX IF NOT EXISTS idx_prayers_created_at ON prayers (created_at);
+CREATE INDEX IF NOT EXISTS idx_prayers_author_id ON prayers (author_id);
+CREATE INDEX IF NOT EXISTS idx_prayer_marks_prayer_id ON prayer_marks (prayer_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions (user_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at);
@@ -0,0 +1,8 @@
+-- Ranking scores for the trending and "needs prayer" feeds, maintained
+-- incrementally by scores.py so ranked pages are a plain index scan.
+
+ALTER TABLE prayers ADD COLUMN trending_score REAL NOT NULL DEFAULT 0;
+ALTER TABLE prayers ADD COLUMN needs_score REAL NOT NULL DEFAULT 1;
+
+CREATE INDEX IF NOT EXISTS idx_prayers_trending_score ON prayers (trending_score);
+CREATE INDEX IF NOT EXISTS idx_prayers_needs_score ON prayers (needs_score);
@@ -0,0 +1,23 @@
+-- Cold storage for old prayers and their marks (see archive.py). Keeping
+-- them out of prayers/prayer_marks keeps the hot tables and their indexes
+-- small enough to stay in the page cache.
+
+CREATE TABLE IF NOT EXISTS prayers_archive (
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    author_id TEXT REFERENCES users(id),
+    created_at TIMESTAMP,
+    generated_prayer TEXT,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS prayer_marks_archive (
+    user_id TEXT REFERENCES users(id),
+    prayer_id TEXT REFERENCES prayers_archive(id),
+    created_at TIMESTAMP,
+    PRIMARY KEY (user_id, prayer_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_prayers_archive_created_at ON prayers_archive (created_at);
+CREATE INDEX IF NOT EXISTS idx_prayers_archive_author_id ON prayers_archive (author_id);
+CREATE INDEX IF NOT EXISTS idx_prayer_marks_archive_prayer_id ON prayer_marks_archive (prayer_id);
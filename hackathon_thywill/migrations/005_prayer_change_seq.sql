@@ -0,0 +1,8 @@
+-- Change sequence for delta sync in /api/prayers: every write that changes
+-- what the API returns for a prayer sets its change_seq to MAX + 1.
+
+ALTER TABLE prayers ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0;
+
+UPDATE prayers SET change_seq = rowid;
+
+CREATE INDEX IF NOT EXISTS idx_prayers_change_seq ON prayers (change_seq);
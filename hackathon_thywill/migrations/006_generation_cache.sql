@@ -0,0 +1,11 @@
+-- Cache of AI prayer responses keyed by normalized request, author, prompt
+-- template version and model (see generation_cache.py).
+
+CREATE TABLE IF NOT EXISTS generation_cache (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_generation_cache_last_used_at ON generation_cache (last_used_at);
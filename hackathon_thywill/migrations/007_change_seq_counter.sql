@@ -0,0 +1,55 @@
+-- Assign change_seq from triggers backed by a monotonic counter, replacing
+-- MAX(change_seq) + 1 at each call site. MAX could hand out a number again
+-- once the prayer holding it was archived, and writers that bypassed the
+-- app (seed imports, scripts) left change_seq at 0, invisible to delta sync.
+
+CREATE TABLE IF NOT EXISTS change_counter (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    seq INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO change_counter (id, seq)
+SELECT 1, COALESCE(MAX(change_seq), 0) FROM prayers;
+
+-- Give prayers written since 005 without a sequence number one now
+UPDATE prayers SET change_seq = (SELECT seq FROM change_counter) + rowid WHERE change_seq = 0;
+UPDATE change_counter SET seq = MAX(seq, (SELECT COALESCE(MAX(change_seq), 0) FROM prayers));
+
+CREATE TRIGGER IF NOT EXISTS prayers_change_seq_insert
+AFTER INSERT ON prayers
+BEGIN
+    UPDATE change_counter SET seq = seq + 1;
+    UPDATE prayers SET change_seq = (SELECT seq FROM change_counter) WHERE rowid = NEW.rowid;
+END;
+
+-- Only columns the API returns; score and change_seq updates do not count
+CREATE TRIGGER IF NOT EXISTS prayers_change_seq_update
+AFTER UPDATE OF text, author_id, generated_prayer ON prayers
+BEGIN
+    UPDATE change_counter SET seq = seq + 1;
+    UPDATE prayers SET change_seq = (SELECT seq FROM change_counter) WHERE rowid = NEW.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS prayer_marks_change_seq_insert
+AFTER INSERT ON prayer_marks
+BEGIN
+    UPDATE change_counter SET seq = seq + 1;
+    UPDATE prayers SET change_seq = (SELECT seq FROM change_counter) WHERE id = NEW.prayer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS prayer_marks_change_seq_delete
+AFTER DELETE ON prayer_marks
+BEGIN
+    UPDATE change_counter SET seq = seq + 1;
+    UPDATE prayers SET change_seq = (SELECT seq FROM change_counter) WHERE id = OLD.prayer_id;
+END;
+
+-- A rename changes every one of the author's prayers; the no-op author_id
+-- update fires prayers_change_seq_update once per row, so each gets its
+-- own number
+CREATE TRIGGER IF NOT EXISTS users_change_seq_rename
+AFTER UPDATE OF display_name ON users
+WHEN NEW.display_name IS NOT OLD.display_name
+BEGIN
+    UPDATE prayers SET author_id = author_id WHERE author_id = NEW.id;
+END;
@@ -0,0 +1,11 @@
+-- Token buckets for rate_limit.py, shared by every worker so configured
+-- limits hold for the whole deployment rather than per process.
+
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    full_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_full_at ON rate_limit_buckets (full_at);
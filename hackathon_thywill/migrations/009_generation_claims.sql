@@ -0,0 +1,8 @@
+-- Short-lived claims on a generation cache key, so a request that arrives
+-- while another worker is already generating the same response waits for
+-- it instead of calling Claude again (see generation_cache.py).
+
+CREATE TABLE IF NOT EXISTS generation_claims (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
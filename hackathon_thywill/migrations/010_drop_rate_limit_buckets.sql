@@ -0,0 +1,4 @@
+-- Rate limit buckets moved to a memory-mapped file in the state directory
+-- (see rate_limit.py), keeping limiter checks off the SQLite write lock.
+
+DROP TABLE IF EXISTS rate_limit_buckets;
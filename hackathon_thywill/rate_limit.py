@@ -0,0 +1,216 @@
+"""
+Admission control for endpoints that call paid upstream APIs.
+
+- RateLimiter: token buckets keyed by user and by client IP, kept in a
+  memory-mapped file in STATE_DIR so every worker draws from the same
+  bucket
+- SharedConcurrencyGate: caps simultaneous upstream calls across all
+  workers with flock slots in STATE_DIR, and sheds load with a 503 once
+  too many requests are already queued (ConcurrencyGate is the same for a
+  single process)
+
+Limits are configured per route through environment variables, e.g.
+RATE_LIMIT_PRAYERS="5/60" (5 requests per 60s per signed-in user or
+signed visitor cookie) and RATE_LIMIT_PRAYERS_IP="20/60". Both limits and gate sizes are totals for
+the whole deployment, whatever the number of workers.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+from contextlib import asynccontextmanager
+from typing import IO, Optional
+from fastapi import Cookie, Depends, HTTPException, Request, status
+from coordination import SlotPool, file_lock, state_path
+from database import get_db
+
+# One bucket slot: key hash, tokens, last update (wall clock, shared by workers)
+BUCKET = struct.Struct("<Qdd")
+BUCKET_WAYS = 4
+
+class RateLimiter:
+    """Token bucket per key: `burst` requests at once, refilled over `period` seconds
+
+    Buckets live in a fixed-size file in STATE_DIR that every worker maps
+    into memory and updates under a flock, so all workers draw from the
+    same bucket without touching the database. A key hashes to one of
+    BUCKET_WAYS neighbouring slots; when they are all taken the least
+    recently used is reused, which only ever forgives a client.
+    """
+
+    def __init__(self, name: str, burst: int, period: float, max_keys: int = 10000):
+        self.name = name
+        self.burst = burst
+        self.rate = burst / period
+        self.sets = max(max_keys // BUCKET_WAYS, 1)
+        self._file = None
+        self._map = None
+        self._pid = None
+
+    def _open(self) -> None:
+        # Workers fork after import, so each process maps the file itself
+        if self._pid == os.getpid():
+            return
+        size = self.sets * BUCKET_WAYS * BUCKET.size
+        f = open(state_path(f"{self.name}.buckets"), "a+b")
+        with file_lock(f"{self.name}.buckets"):
+            if os.fstat(f.fileno()).st_size < size:
+                f.truncate(size)
+        self._file, self._map, self._pid = f, mmap.mmap(f.fileno(), size), os.getpid()
+
+    def check(self, key: str) -> Optional[float]:
+        """Take a token for key; return None if allowed, else seconds until retry"""
+        self._open()
+        # 0 marks an empty slot, so keep real hashes non-zero
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        first = (key_hash % self.sets) * BUCKET_WAYS
+        now = time.time()
+
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            slots = [(i, *BUCKET.unpack_from(self._map, i * BUCKET.size)) for i in range(first, first + BUCKET_WAYS)]
+            match = next((s for s in slots if s[1] == key_hash), None)
+            if match:
+                index, _, tokens, updated = match
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            else:
+                index = min(slots, key=lambda s: s[3])[0]
+                tokens = self.burst
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            BUCKET.pack_into(self._map, index * BUCKET.size, key_hash, tokens, now)
+        finally:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+
+        return None if allowed else (1 - tokens) / self.rate
+
+class ConcurrencyGate:
+    """Limit concurrent work in this process, rejecting work when the queue is too deep
+
+    For work bounded by a per-process resource, such as a thread pool.
+    Upstream API calls use SharedConcurrencyGate instead.
+    """
+
+    def __init__(self, label: str, limit: int, max_waiting: int, retry_after: int = 5):
+        self.label = label
+        self.max_waiting = max_waiting
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(limit)
+        self._waiting = 0
+
+    def _busy(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{self.label} is busy, please try again shortly",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+    async def acquire(self):
+        """Take a slot, queueing if necessary; pass the result to release()"""
+        if self._semaphore.locked() and self._waiting >= self.max_waiting:
+            raise self._busy()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+    def release(self, slot=None) -> None:
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the body of an async with block"""
+        held = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(held)
+
+class SharedConcurrencyGate(ConcurrencyGate):
+    """Limit concurrent upstream calls across all workers
+
+    A request holds one of `limit` running slots for the duration of its
+    call. When none is free it takes one of `max_waiting` queue slots and
+    polls for a running slot; with the queue full too it gets a 503.
+    """
+
+    def __init__(self, name: str, label: str, limit: int, max_waiting: int, retry_after: int = 5, poll_interval: float = 0.05):
+        self.label = label
+        self.retry_after = retry_after
+        self.poll_interval = poll_interval
+        self._running = SlotPool(f"{name}-running", limit)
+        self._waiting = SlotPool(f"{name}-waiting", max_waiting)
+
+    async def acquire(self) -> IO:
+        """Take a running slot, queueing if necessary; pass the result to release()"""
+        slot = self._running.try_acquire()
+        if slot:
+            return slot
+        place = self._waiting.try_acquire()
+        if place is None:
+            raise self._busy()
+        try:
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                slot = self._running.try_acquire()
+                if slot:
+                    return slot
+        finally:
+            self._waiting.release(place)
+
+    def release(self, slot: IO) -> None:
+        self._running.release(slot)
+
+def _limit_from_env(name: str, default: str) -> RateLimiter:
+    """Parse a "count/seconds" limit such as "5/60" """
+    count, seconds = os.getenv(name, default).split("/")
+    return RateLimiter(name.lower(), int(count), float(seconds))
+
+def rate_limit(route: str, per_session: str, per_ip: str):
+    """Build a FastAPI dependency enforcing per-session and per-IP limits for route"""
+    env_name = f"RATE_LIMIT_{route.upper()}"
+    session_limiter = _limit_from_env(env_name, per_session)
+    ip_limiter = _limit_from_env(f"{env_name}_IP", per_ip)
+
+    async def dependency(request: Request, session_id: Optional[str] = Cookie(None), visitor_id: Optional[str] = Cookie(None), db = Depends(get_db)):
+        # Imported here because auth uses this module's ConcurrencyGate
+        from auth import get_current_user, read_visitor_id
+        
+        checks = [(ip_limiter, request.client.host if request.client else "unknown")]
+        # Key on a verified identity only; random cookies fall back to the IP limit
+        user = get_current_user(session_id, db) if session_id else None
+        user_id = user["id"] if user else read_visitor_id(visitor_id)
+        if user_id:
+            checks.append((session_limiter, user_id))
+        for limiter, key in checks:
+            retry_after = limiter.check(key)
+            if retry_after is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests, please slow down",
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+
+    return dependency
+
+# Global gates for upstream services
+claude_gate = SharedConcurrencyGate(
+    "claude",
+    "Prayer generation",
+    limit=int(os.getenv("CLAUDE_MAX_CONCURRENCY", "4")),
+    max_waiting=int(os.getenv("CLAUDE_MAX_QUEUE", "16"))
+)
+tts_gate = SharedConcurrencyGate(
+    "tts",
+    "Audio generation",
+    limit=int(os.getenv("TTS_MAX_CONCURRENCY", "2")),
+    max_waiting=int(os.getenv("TTS_MAX_QUEUE", "8"))
+)
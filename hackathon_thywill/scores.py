@@ -0,0 +1,109 @@
+"""
+Ranking scores for the alternative feed orderings.
+
+trending_score: marks with exponential time decay. Each mark adds 1 and
+the periodic job multiplies every score by the decay since its last run,
+so a mark counts half as much after TRENDING_HALF_LIFE_HOURS.
+
+needs_score: (1 + marks) / (1 + age in hours). Lower means the prayer has
+had fewer people pray for it than its age would suggest. The "needs
+prayer" feed lists prayers from the last NEEDS_PRAYER_WINDOW_DAYS with the
+lowest score first.
+
+Both are stored as indexed columns on prayers and updated on every mark
+and unmark; the periodic job applies decay and ageing. needs_score is
+only kept current inside the window.
+"""
+
+import math
+import os
+import time
+from datetime import datetime
+from database import connect
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+NEEDS_PRAYER_WINDOW_DAYS = int(os.getenv("NEEDS_PRAYER_WINDOW_DAYS", "7"))
+
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+
+# Trending scores below this are rounded down to 0 and left alone
+MIN_TRENDING_SCORE = 0.001
+
+NEEDS_SCORE_SQL = """
+    (1.0 + (SELECT COUNT(*) FROM prayer_marks pm WHERE pm.prayer_id = prayers.id))
+    / (1.0 + MAX(julianday('now') - julianday(prayers.created_at), 0) * 24)
+"""
+
+# Monotonic time of the last decay in this process; None until the leader
+# has rebuilt the scores once
+_last_decay = None
+
+def _mark_weight(marked_at: str) -> float:
+    """Current trending weight of a mark made at marked_at (UTC)"""
+    try:
+        age = (datetime.utcnow() - datetime.fromisoformat(marked_at)).total_seconds()
+    except (TypeError, ValueError):
+        return 1.0
+    return math.exp(-DECAY_RATE * max(age, 0))
+
+def on_mark(db, prayer_id: str) -> None:
+    """Update scores after a new mark; caller commits"""
+    db.execute(f"""
+        UPDATE prayers
+        SET trending_score = trending_score + 1, needs_score = {NEEDS_SCORE_SQL}
+        WHERE id = ?
+    """, (prayer_id,))
+
+def on_unmark(db, prayer_id: str, marked_at: str) -> None:
+    """Update scores after a mark made at marked_at is removed; caller commits"""
+    db.execute(f"""
+        UPDATE prayers
+        SET trending_score = MAX(trending_score - ?, 0), needs_score = {NEEDS_SCORE_SQL}
+        WHERE id = ?
+    """, (_mark_weight(marked_at), prayer_id))
+
+def rebuild_scores(conn) -> None:
+    """Recompute scores from prayer_marks
+
+    Bounded so it stays cheap on every leader election: only marks that
+    still carry trending weight are written, and needs scores only matter
+    inside the window.
+    """
+    weights = {}
+    for prayer_id, created_at in conn.execute("SELECT prayer_id, created_at FROM prayer_marks"):
+        weights[prayer_id] = weights.get(prayer_id, 0.0) + _mark_weight(created_at)
+    with conn:
+        conn.execute("UPDATE prayers SET trending_score = 0 WHERE trending_score > 0")
+        conn.executemany(
+            "UPDATE prayers SET trending_score = ? WHERE id = ?",
+            [(weight, prayer_id) for prayer_id, weight in weights.items() if weight > MIN_TRENDING_SCORE]
+        )
+        conn.execute(f"""
+            UPDATE prayers SET needs_score = {NEEDS_SCORE_SQL}
+            WHERE created_at >= datetime('now', ?)
+        """, (f"-{NEEDS_PRAYER_WINDOW_DAYS} days",))
+
+def refresh_scores() -> None:
+    """Periodic job: decay trending scores and re-age needs scores
+
+    The first run in a newly elected leader rebuilds everything, which also
+    backfills scores for data from before this column existed.
+    """
+    global _last_decay
+    now = time.monotonic()
+    conn = connect()
+    try:
+        if _last_decay is None:
+            rebuild_scores(conn)
+        else:
+            factor = math.exp(-DECAY_RATE * (now - _last_decay))
+            with conn:
+                conn.execute("UPDATE prayers SET trending_score = trending_score * ? WHERE trending_score > ?", (factor, MIN_TRENDING_SCORE))
+                conn.execute("UPDATE prayers SET trending_score = 0 WHERE trending_score > 0 AND trending_score <= ?", (MIN_TRENDING_SCORE,))
+                conn.execute(f"""
+                    UPDATE prayers SET needs_score = {NEEDS_SCORE_SQL}
+                    WHERE created_at >= datetime('now', ?)
+                """, (f"-{NEEDS_PRAYER_WINDOW_DAYS} days",))
+        _last_decay = now
+    finally:
+        conn.close()
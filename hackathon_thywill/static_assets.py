@@ -0,0 +1,62 @@
+"""
+Serving for the fingerprinted assets produced by build_static.py.
+
+asset_url() maps a source name like "style.css" to its fingerprinted URL
+when a build exists, falling back to the plain file during development.
+PrecompressedStaticFiles serves the .br/.gz sibling a client accepts and
+marks fingerprinted files as immutable, since their names change
+whenever their content does.
+"""
+
+import json
+import mimetypes
+import os
+from functools import lru_cache
+from anyio import to_thread
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from build_static import MANIFEST_PATH
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@lru_cache(maxsize=1)
+def _manifest() -> dict:
+    try:
+        return json.loads(MANIFEST_PATH.read_text())
+    except FileNotFoundError:
+        return {}
+
+def asset_url(path: str) -> str:
+    """URL for a static asset, fingerprinted if build_static.py has been run"""
+    return f"/static/{_manifest().get(path, path)}"
+
+class PrecompressedStaticFiles(StaticFiles):
+    async def get_response(self, path, scope):
+        if scope["method"] not in ("GET", "HEAD") or not path.startswith("dist" + os.sep):
+            return await super().get_response(path, scope)
+
+        accepted = Headers(scope=scope).get("accept-encoding", "")
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None:
+                continue
+            # Serve the compressed sibling with the original file's content type
+            response = self.file_response(full_path, stat_result, scope)
+            response.headers["content-type"] = _content_type(path)
+            response.headers["content-encoding"] = encoding
+            break
+        else:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            response.headers["vary"] = "Accept-Encoding"
+        return response
+
+def _content_type(path: str) -> str:
+    media_type, _ = mimetypes.guess_type(path)
+    if media_type and media_type.startswith("text/"):
+        media_type += "; charset=utf-8"
+    return media_type or "application/octet-stream"
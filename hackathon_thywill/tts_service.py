@@ -18,9 +18,8 @@ class TTSService:
         # Alternative: "21m00Tcm4TlvDq8ikWAM"  # Rachel - expressive
         # Alternative: "AZnzlk1XvdvUeBnXmlld"  # Domi - calm, soothing
         
-        # Setup audio cache directory
+        # Audio cache directory, created on first write
         self.cache_dir = Path("audio_cache")
-        self.cache_dir.mkdir(exist_ok=True)
     
     def _get_cache_key(self, text: str, voice_id: str) -> str:
         """Generate cache key from text and voice ID"""
@@ -41,6 +40,7 @@ class TTSService:
         """Save audio data to cache"""
         cache_file = self.cache_dir / f"{cache_key}.mp3"
         try:
+            self.cache_dir.mkdir(exist_ok=True)
             cache_file.write_bytes(audio_data)
         except Exception as e:
             print(f"Failed to cache audio: {e}")
@@ -150,6 +150,13 @@ class TTSService:
             return base64.b64encode(audio_bytes).decode('utf-8')
         return None
     
+    def get_cached_audio_base64(self, text: str, voice_id: Optional[str] = None) -> Optional[str]:
+        """Return previously generated audio as base64 without calling the API"""
+        audio_bytes = self._get_cached_audio(self._get_cache_key(text, voice_id or self.default_voice_id))
+        if audio_bytes:
+            return base64.b64encode(audio_bytes).decode('utf-8')
+        return None
+    
     def get_available_voices(self) -> list:
         """Get list of available voices from ElevenLabs"""
         if not self.api_key: